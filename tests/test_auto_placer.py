@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+from windowcharmer.auto_placer import load_rules, match_rule
+
+def write_rules(tmp_path, rules):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps(rules))
+    return str(path)
+
+def test_match_rule(tmp_path):
+    rules = load_rules(write_rules(tmp_path, [
+        {"class": "^firefox$", "title": "Private", "zone": "right"},
+        {"class": "firefox", "zone": "left"},
+        {"title": "^Slack", "zone": "top-right"},
+    ]))
+    assert match_rule(rules, ('navigator', 'firefox'), 'Mozilla Firefox Private Browsing') == 'right'
+    assert match_rule(rules, ('Navigator', 'firefox'), 'Mozilla Firefox') == 'left'
+    assert match_rule(rules, ('slack', 'Slack'), 'Slack | general') == 'top-right'
+    assert match_rule(rules, ('xterm', 'XTerm'), 'bash') is None
+    assert match_rule(rules, (), 'Unknown') is None
+
+@pytest.mark.parametrize('rules', [
+    {"class": "firefox", "zone": "left"},
+    ["left"],
+    [{"class": "firefox"}],
+    [{"class": "(", "zone": "left"}],
+    [{"title": 5, "zone": "left"}],
+])
+def test_invalid_rules_raise_value_error(tmp_path, rules):
+    with pytest.raises(ValueError):
+        load_rules(write_rules(tmp_path, rules))
+
+def test_invalid_json_raises_value_error(tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text('[{"zone": ')
+    with pytest.raises(ValueError):
+        load_rules(str(path))
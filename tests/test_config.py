@@ -0,0 +1,20 @@
+import shelve
+
+from windowcharmer.windowcharmer import Config
+
+def test_primary_monitor_falls_back_to_legacy_keys(tmp_path):
+    path = str(tmp_path / 'state.shelf')
+    with shelve.open(path) as config:
+        config['ratio_idx_0'] = 3
+        config['measured_height'] = 1400
+
+    primary = Config(0, path, 'DP-1', legacy_keys=True)
+    assert (primary.ratio_idx, primary.measured_height) == (3, 1400)
+    other = Config(0, path, 'HDMI-1')
+    assert (other.ratio_idx, other.measured_height) == (2, None)
+
+    # once a monitor saved its own value, that one wins
+    primary.next_ratio()
+    assert Config(0, path, 'DP-1', legacy_keys=True).ratio_idx == 4
+    with shelve.open(path) as config:
+        assert config['ratio_idx_0'] == 3
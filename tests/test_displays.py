@@ -0,0 +1,26 @@
+from windowcharmer.windowcharmer import (CONFIG_FILE_TEMPLATE, DEFAULT_CONFIG_FILE, config_file_for, discover_displays,
+                                         normalize_display_name)
+
+def test_normalize_display_name():
+    assert normalize_display_name(':0') == ':0'
+    assert normalize_display_name(':0.0') == ':0'
+    assert normalize_display_name('host:10.1') == 'host:10'
+
+def test_default_display_keeps_the_legacy_file(monkeypatch):
+    monkeypatch.setenv('DISPLAY', ':0.0')
+    assert config_file_for(':0', default_file=DEFAULT_CONFIG_FILE) == DEFAULT_CONFIG_FILE
+    assert config_file_for(':0.0', default_file=DEFAULT_CONFIG_FILE) == DEFAULT_CONFIG_FILE
+    assert config_file_for(':1', default_file=DEFAULT_CONFIG_FILE) == CONFIG_FILE_TEMPLATE.format('_1')
+    # without a default file, even $DISPLAY gets its own
+    assert config_file_for(':0') == CONFIG_FILE_TEMPLATE.format('_0')
+
+def test_config_file_without_display(monkeypatch):
+    monkeypatch.delenv('DISPLAY', raising=False)
+    assert config_file_for(':0', default_file=DEFAULT_CONFIG_FILE) == CONFIG_FILE_TEMPLATE.format('_0')
+    assert config_file_for('host/unix:2.0') == CONFIG_FILE_TEMPLATE.format('host_unix_2')
+
+def test_discover_displays(tmp_path):
+    for name in ('X10', 'X0', 'X2', 'Xfoo', 'lock', 'X'):
+        (tmp_path / name).touch()
+    assert discover_displays(str(tmp_path)) == [':0', ':2', ':10']
+    assert discover_displays(str(tmp_path / 'missing')) == []
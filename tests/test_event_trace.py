@@ -0,0 +1,45 @@
+import os
+import stat
+
+import pytest
+from Xlib import X
+
+from windowcharmer.event_trace import ACTION, GRAB, KEY_PRESS, KEY_RELEASE, OTHER_KEY, TraceWriter, percentile, read_trace
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'trace')
+    trace = TraceWriter(path)
+    trace.key(X.KeyPress, 133)
+    trace.other_key()
+    trace.key(X.KeyRelease, 133)
+    trace.grab(113, 0x40)
+    trace.action('left', 0.0025)
+    trace.action('left', 0.001)
+    trace.action('max', 0.002)
+    trace.close()
+
+    records = [(kind, value, extra) for _, kind, value, extra in read_trace(path)]
+    assert records == [
+        (KEY_PRESS, 133, None),
+        (KEY_PRESS, OTHER_KEY, None),
+        (KEY_RELEASE, 133, None),
+        (GRAB, 113, 0x40),
+        (ACTION, 'left', 0.0025),
+        (ACTION, 'left', 0.001),
+        (ACTION, 'max', 0.002),
+    ]
+
+def test_only_readable_by_owner(tmp_path):
+    path = str(tmp_path / 'trace')
+    TraceWriter(path).close()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'trace'
+    path.write_bytes(b'not a trace')
+    with pytest.raises(ValueError):
+        list(read_trace(str(path)))
+
+def test_percentile():
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile([3, 1, 2], 0.95) == 3
@@ -0,0 +1,64 @@
+from array import array
+
+from windowcharmer.geometry_history import FIELDS, GeometryHistory
+from windowcharmer.window_registry import WindowRecord
+
+class FakeHistory(GeometryHistory):
+    """Saves the record's current x instead of asking the server for the geometry."""
+
+    def __init__(self, depth):
+        super().__init__(None, None, None, depth)
+        self.x = 0
+
+    def _save(self, window, history, slot):
+        history.data[slot * FIELDS:(slot + 1) * FIELDS] = array('i', (self.x, 0, 100, 100, 0))
+
+def move(history, record, x):
+    history.push(record)
+    history.x = x
+
+def undo(history, record):
+    entry = history.undo(record)
+    if entry is not None:
+        history.x = entry[0]
+        return entry[0]
+
+def redo(history, record):
+    entry = history.redo(record)
+    if entry is not None:
+        history.x = entry[0]
+        return entry[0]
+
+def test_nothing_to_undo_or_redo():
+    history, record = FakeHistory(4), WindowRecord(1, None, 0)
+    assert history.undo(record) is None
+    assert history.redo(record) is None
+    move(history, record, 1)
+    assert history.redo(record) is None
+
+def test_undo_redo():
+    history, record = FakeHistory(4), WindowRecord(1, None, 0)
+    for x in (1, 2, 3):
+        move(history, record, x)
+    assert [undo(history, record) for _ in range(4)] == [2, 1, 0, None]
+    assert [redo(history, record) for _ in range(4)] == [1, 2, 3, None]
+
+def test_move_drops_redo():
+    history, record = FakeHistory(4), WindowRecord(1, None, 0)
+    for x in (1, 2, 3):
+        move(history, record, x)
+    undo(history, record)
+    move(history, record, 7)
+    assert redo(history, record) is None
+    assert [undo(history, record) for _ in range(4)] == [2, 1, 0, None]
+
+def test_wrap_around_keeps_the_latest_entries():
+    history, record = FakeHistory(3), WindowRecord(1, None, 0)
+    for x in range(1, 6):
+        move(history, record, x)
+    assert [undo(history, record) for _ in range(4)] == [4, 3, 2, None]
+    assert [redo(history, record) for _ in range(4)] == [3, 4, 5, None]
+    # and again, with the ring's head away from slot 0
+    move(history, record, 6)
+    move(history, record, 7)
+    assert [undo(history, record) for _ in range(4)] == [6, 5, 4, None]
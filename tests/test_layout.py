@@ -0,0 +1,57 @@
+from windowcharmer.layout import SUPPORTED_LAYOUTS, ZONE_NAMES, Layout, screen_dimensions
+from windowcharmer.windowcharmer import WindowManager
+
+LAYOUTS = {layout.name: layout for layout in SUPPORTED_LAYOUTS}
+
+def dim_for(name, width=5120, height=1440, decorations=30, panel=64, x_offset=0):
+    return screen_dimensions(height, width, LAYOUTS[name], None, decorations, panel, x_offset, 0)
+
+def test_columns_cover_the_screen_without_gaps():
+    for layout in SUPPORTED_LAYOUTS:
+        dim = dim_for(layout.name)
+        assert dim.columns[0][0] == 0
+        for (x, w), (next_x, _) in zip(dim.columns, dim.columns[1:]):
+            assert x + w == next_x
+        assert dim.columns[-1][0] + dim.columns[-1][1] == 5120
+
+def test_rows_match_previous_two_row_geometry():
+    dim = dim_for('40% center')
+    # (1440 - 30) // 2 = 705, bottom row at 1440 - 705 + 64 (panel)
+    assert dim.rows == [(0, 705), (799, 705)]
+    assert dim.zones['left'] == (0, 0, 1536, 1440, 1)
+    assert dim.zones['bottom-center'] == (1536, 799, 2048, 705, 0)
+
+def test_offsets_move_every_zone():
+    dim = dim_for('4 columns', x_offset=2560)
+    assert dim.zones['left'][0] == 2560
+    assert dim.zones['center-right'][0] == 2560 + 2560
+
+def test_zone_names():
+    assert Layout('x', (1, 1, 1, 1)).column_names == ('left', 'center-left', 'center-right', 'right')
+    assert Layout('x', (1,) * 6).column_names[5] == 'column-6'
+    assert 'top-center-left' in ZONE_NAMES
+
+def test_remap_zone_picks_nearest_zone():
+    three = dim_for('40% center')
+    two = dim_for('2 columns')
+    four = dim_for('4 columns')
+    assert two.remap_zone('center', three) == 'left'
+    assert two.remap_zone('top-right', three) == 'top-right'
+    assert four.remap_zone('center', three) == 'center-left'
+    assert four.remap_zone('bottom-right', three) == 'bottom-right'
+
+def test_zone_from_geometry():
+    dim = dim_for('40% center')
+    for zone, (x, y, w, h, v_max) in dim.zones.items():
+        assert WindowManager.zone_from_geometry(dim, x, y, w, h, bool(v_max)) == zone
+    # slightly off, ex: because of decorations, still matches
+    assert WindowManager.zone_from_geometry(dim, 10, 20, 1500, 690) == 'top-left'
+    assert WindowManager.zone_from_geometry(dim, 700, 300, 640, 480) == 'unknown-unknown'
+    assert WindowManager.zone_from_geometry(dim, 700, 0, 640, 1440) == 'unknown'
+
+def test_nearest_zone_for_zones_missing_from_the_layout():
+    assert dim_for('4 columns').nearest_zone('center') == 'center-left'
+    assert dim_for('4 columns').nearest_zone('top-center') == 'top-center-left'
+    assert dim_for('40% center').nearest_zone('center-right') == 'center'
+    assert dim_for('2 columns').nearest_zone('bottom-center') == 'bottom-left'
+    assert dim_for('5 columns').nearest_zone('center') == 'center'
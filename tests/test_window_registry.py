@@ -0,0 +1,62 @@
+from windowcharmer.window_registry import UNSET, WindowRegistry
+
+class FakeDisplay:
+    def __init__(self):
+        self.created = []
+
+    def create_resource_object(self, kind, wid):
+        self.created.append(wid)
+        return (kind, wid)
+
+def test_reuses_resource_objects():
+    d = FakeDisplay()
+    registry = WindowRegistry(d)
+    assert registry.get(1).window is registry.get(1).window
+    assert d.created == [1]
+
+def test_volatile_attributes_expire_with_the_action():
+    registry = WindowRegistry(FakeDisplay())
+    record = registry.get(1)
+    record.desktop, record.title, record.gtk_extents, record.wm_class = 0, b'title', None, ('a', 'A')
+    assert registry.get(1).title == b'title'
+
+    registry.begin_action()
+    record = registry.get(1)
+    assert record.desktop is UNSET and record.title is UNSET and record.gtk_extents is UNSET
+    assert record.wm_class == ('a', 'A')
+
+def test_hits_count_once_per_action():
+    registry = WindowRegistry(FakeDisplay())
+    for _ in range(3):
+        registry.get(1)
+    assert (registry.hits, registry.misses) == (0, 1)
+    registry.begin_action()
+    for _ in range(3):
+        registry.get(1)
+    assert (registry.hits, registry.misses) == (1, 1)
+    assert registry.hit_rate == 0.5
+
+def test_evicts_least_recently_used():
+    registry = WindowRegistry(FakeDisplay(), max_size=2)
+    registry.get(1)
+    registry.get(2)
+    registry.get(1)
+    registry.get(3)
+    assert len(registry) == 2
+    assert registry.misses == 3
+    registry.get(1)
+    assert registry.misses == 3
+    registry.get(2)
+    assert registry.misses == 4
+
+def test_prune_and_evict():
+    d = FakeDisplay()
+    registry = WindowRegistry(d)
+    for wid in (1, 2, 3):
+        registry.get(wid).history = object()
+    registry.prune([2, 3])
+    registry.evict(3)
+    assert len(registry) == 1
+    # a reused id starts from scratch
+    assert registry.get(1).history is None
+    assert registry.get(2).history is not None
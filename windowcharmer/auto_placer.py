@@ -0,0 +1,93 @@
+from Xlib import X, display
+import json
+import re
+import sys
+import traceback
+
+def load_rules(path):
+    """
+    Loads placement rules from a JSON file, ex:
+
+        [{"class": "firefox", "zone": "left"}, {"title": "^Slack", "zone": "top-right"}]
+
+    "class" is matched against both parts of WM_CLASS, "title" against the window title.
+    Both are regular expressions (re.search); the first rule whose given fields all match wins.
+    """
+    with open(path) as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError(f"placement rules must be a list, got: {rules}")
+    compiled = []
+    for rule in rules:
+        if not isinstance(rule, dict):
+            raise ValueError(f"placement rule is not an object: {rule}")
+        if 'zone' not in rule:
+            raise ValueError(f"placement rule without a zone: {rule}")
+        try:
+            compiled.append((
+                re.compile(rule['class']) if 'class' in rule else None,
+                re.compile(rule['title']) if 'title' in rule else None,
+                rule['zone'],
+            ))
+        except (re.error, TypeError) as e:
+            raise ValueError(f"invalid pattern in placement rule {rule}: {e}") from e
+    return compiled
+
+def match_rule(rules, wm_class, title):
+    for class_re, title_re, zone in rules:
+        if class_re and not any(class_re.search(c) for c in wm_class):
+            continue
+        if title_re and not title_re.search(title):
+            continue
+        return zone
+    return None
+
+class AutoPlacer:
+    def __init__(self, dpy, callback):
+        """
+        Watches _NET_CLIENT_LIST for windows the WM starts managing.
+
+        :param dpy: Display used only by this watcher (it blocks in next_event).
+        :param callback: Called with the id of every new client window.
+        """
+        self.dpy = dpy
+        self.callback = callback
+        self.root = dpy.screen().root
+        self.client_list = dpy.intern_atom('_NET_CLIENT_LIST')
+        self.known = set()
+
+    def get_client_ids(self):
+        prop = self.root.get_full_property(self.client_list, X.AnyPropertyType)
+        return set(prop.value) if prop else set()
+
+    def start(self):
+        self.root.change_attributes(event_mask=X.PropertyChangeMask)
+        # windows that already exist are not "new"
+        self.known = self.get_client_ids()
+        while True:
+            event = self.dpy.next_event()
+            if event.type == X.PropertyNotify and event.atom == self.client_list:
+                current = self.get_client_ids()
+                new = current - self.known
+                self.known = current
+                for wid in new:
+                    self.callback(wid)
+
+
+if __name__ == "__main__":
+
+    dpy = display.Display()
+
+    def callback(wid):
+        print(f"New window: 0x{wid:x}")
+
+    try:
+        placer = AutoPlacer(dpy, callback)
+        placer.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    except:
+        print("Unexpected error:", sys.exc_info()[0])
+        traceback.print_exc()
+    finally:
+        dpy.flush()
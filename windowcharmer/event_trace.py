@@ -0,0 +1,239 @@
+from Xlib import X, Xatom, display
+import argparse
+import os
+import struct
+import sys
+import threading
+import time
+import traceback
+
+# Trace file layout: MAGIC, then records of RECORD (seconds since start, kind, code) plus a kind specific payload
+#  KEY_PRESS/KEY_RELEASE: code=keycode, no payload           (seen by KeyMonitor; only keys it acts on, ex: Super_L)
+#  KEY_PRESS:             code=OTHER_KEY, no payload          (any other key was pressed, which key is not recorded)
+#  GRAB:                  code=keycode, payload=STATE        (handled by KeyGrabber)
+#  NAME:                  code=name id, payload=LENGTH+bytes (defines an action name, written before first use)
+#  ACTION:                code=name id, payload=DURATION     (action dispatched, and how long it took in microseconds)
+MAGIC = b'WCTR\x01'
+RECORD = struct.Struct('<dBH')
+STATE = struct.Struct('<H')
+LENGTH = struct.Struct('<B')
+DURATION = struct.Struct('<I')
+
+# X keycodes start at 8
+OTHER_KEY = 0
+
+KEY_PRESS = 1
+KEY_RELEASE = 2
+GRAB = 3
+NAME = 4
+ACTION = 5
+
+class TraceWriter:
+    def __init__(self, path):
+        """
+        Appends compact binary records of handled X events and dispatched actions to a file.
+
+        Safe to share between the KeyMonitor, KeyGrabber and action threads.
+        The file is only readable by the current user, as key timings can still tell a lot about what was typed.
+        """
+        self.path = path
+        self.f = os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb')
+        self.f.write(MAGIC)
+        self.start = time.monotonic()
+        self.names = {}
+        self.lock = threading.RLock()
+
+    def _write(self, kind, code, payload=b''):
+        with self.lock:
+            self.f.write(RECORD.pack(time.monotonic() - self.start, kind, code) + payload)
+
+    def key(self, event_type, keycode):
+        self._write(KEY_PRESS if event_type == X.KeyPress else KEY_RELEASE, keycode)
+
+    def other_key(self):
+        self._write(KEY_PRESS, OTHER_KEY)
+
+    def grab(self, keycode, state):
+        self._write(GRAB, keycode, STATE.pack(state & 0xffff))
+
+    def action(self, name, duration):
+        with self.lock:
+            name_id = self.names.get(name)
+            if name_id is None:
+                # the NAME record has to be written before any other thread can use the new id
+                encoded = name.encode('utf-8')[:255]
+                name_id = self.names[name] = len(self.names)
+                self._write(NAME, name_id, LENGTH.pack(len(encoded)) + encoded)
+        self._write(ACTION, name_id, DURATION.pack(min(int(duration * 1e6), 0xffffffff)))
+
+    def flush(self):
+        with self.lock:
+            self.f.flush()
+
+    def close(self):
+        with self.lock:
+            self.f.close()
+
+def read_trace(path):
+    """Yields (seconds, kind, value, extra) per record; value is a keycode or action name."""
+    names = {}
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a windowcharmer trace")
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            t, kind, code = RECORD.unpack(header)
+            if kind in (KEY_PRESS, KEY_RELEASE):
+                yield t, kind, code, None
+            elif kind == GRAB:
+                yield t, kind, code, STATE.unpack(f.read(STATE.size))[0]
+            elif kind == NAME:
+                length, = LENGTH.unpack(f.read(LENGTH.size))
+                names[code] = f.read(length).decode('utf-8')
+            elif kind == ACTION:
+                yield t, kind, names[code], DURATION.unpack(f.read(DURATION.size))[0] / 1e6
+            else:
+                raise ValueError(f"unknown record kind {kind} in {path}")
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+def print_latency_table(latencies, recorded=None):
+    print(f"{'action':<20} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'recorded p50':>13}")
+    for name, values in sorted(latencies.items()):
+        rec = f"{percentile(recorded[name], 0.5) * 1000:.2f}" if recorded and recorded.get(name) else '-'
+        print(f"{name:<20} {len(values):>6} {sum(values) / len(values) * 1000:>9.2f} {percentile(values, 0.5) * 1000:>9.2f} "
+              f"{percentile(values, 0.95) * 1000:>9.2f} {max(values) * 1000:>9.2f} {rec:>13}")
+
+def dump(path):
+    counts = {}
+    recorded = {}
+    for t, kind, value, extra in read_trace(path):
+        counts[kind] = counts.get(kind, 0) + 1
+        if kind == ACTION:
+            recorded.setdefault(value, []).append(extra)
+            print(f"{t:10.3f} action {value} {extra * 1000:.2f}ms")
+        elif kind == GRAB:
+            print(f"{t:10.3f} grab   keycode={value} state=0x{extra:x}")
+        elif value == OTHER_KEY:
+            print(f"{t:10.3f} key    other press")
+        else:
+            print(f"{t:10.3f} key    keycode={value} {'press' if kind == KEY_PRESS else 'release'}")
+    print(f"{counts.get(KEY_PRESS, 0) + counts.get(KEY_RELEASE, 0)} key events, {counts.get(GRAB, 0)} grabbed keys, {counts.get(ACTION, 0)} actions")
+    if recorded:
+        print_latency_table(recorded)
+
+def create_synthetic_desktop(dpy, count):
+    """
+    Fakes just enough of an EWMH window manager for the tiler to work against a bare Xvfb:
+    `count` mapped top-level windows on desktop 0, listed in _NET_CLIENT_LIST(_STACKING).
+    """
+    screen = dpy.screen()
+    root = screen.root
+    atom = dpy.intern_atom
+    windows = []
+    for i in range(count):
+        window = root.create_window(
+            (i * 37) % max(screen.width_in_pixels - 640, 1), (i * 23) % max(screen.height_in_pixels - 480, 1),
+            640, 480, 0, screen.root_depth, X.InputOutput, X.CopyFromParent,
+            background_pixel=screen.white_pixel)
+        window.set_wm_name(f"windowcharmer replay {i}")
+        window.set_wm_class(f"replay{i}", "WindowcharmerReplay")
+        window.change_property(atom('_NET_WM_DESKTOP'), Xatom.CARDINAL, 32, [0])
+        window.map()
+        windows.append(window)
+
+    ids = [w.id for w in windows]
+    root.change_property(atom('_NET_CLIENT_LIST'), Xatom.WINDOW, 32, ids)
+    root.change_property(atom('_NET_CLIENT_LIST_STACKING'), Xatom.WINDOW, 32, ids)
+    root.change_property(atom('_NET_CURRENT_DESKTOP'), Xatom.CARDINAL, 32, [0])
+    root.change_property(atom('_NET_WORKAREA'), Xatom.CARDINAL, 32, [0, 0, screen.width_in_pixels, screen.height_in_pixels])
+    dpy.sync()
+    return windows
+
+# root window properties set by create_synthetic_desktop() and replay()
+ROOT_PROPERTIES = ('_NET_CLIENT_LIST', '_NET_CLIENT_LIST_STACKING', '_NET_CURRENT_DESKTOP', '_NET_WORKAREA', '_NET_ACTIVE_WINDOW')
+
+def save_root_properties(dpy):
+    root = dpy.screen().root
+    return {name: root.get_full_property(dpy.intern_atom(name), X.AnyPropertyType) for name in ROOT_PROPERTIES}
+
+def restore_root_properties(dpy, saved):
+    # put back what was there before, so nothing is left pointing at the destroyed synthetic windows
+    root = dpy.screen().root
+    for name, prop in saved.items():
+        if prop is None:
+            root.delete_property(dpy.intern_atom(name))
+        else:
+            root.change_property(dpy.intern_atom(name), prop.property_type, prop.format, prop.value)
+
+def replay(path, display_name, window_count=16, realtime=False):
+    """
+    Replays the actions of a trace against `display_name` (meant to be a scratch Xvfb), and reports per action latency.
+
+    :param window_count: Number of synthetic windows; the active window cycles through them between actions.
+    :param realtime: Keep the recorded spacing between actions instead of replaying back to back.
+    """
+    # imported here, since windowcharmer imports this module for TraceWriter
+    from .windowcharmer import do_action
+
+    records = [r for r in read_trace(path) if r[1] == ACTION]
+    if not records:
+        print(f"no actions in {path}")
+        return
+
+    dpy = display.Display(display_name)
+    saved = save_root_properties(dpy)
+    windows = []
+    try:
+        windows = create_synthetic_desktop(dpy, window_count)
+        active_atom = dpy.intern_atom('_NET_ACTIVE_WINDOW')
+
+        recorded = {}
+        latencies = {}
+        start = time.monotonic()
+        for i, (t, _, name, duration) in enumerate(records):
+            if realtime:
+                delay = t - records[0][0] - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            dpy.screen().root.change_property(active_atom, Xatom.WINDOW, 32, [windows[i % len(windows)].id])
+            dpy.sync()
+            begin = time.perf_counter()
+            do_action(name, display_name)
+            latencies.setdefault(name, []).append(time.perf_counter() - begin)
+            recorded.setdefault(name, []).append(duration)
+
+        print_latency_table(latencies, recorded)
+    finally:
+        restore_root_properties(dpy, saved)
+        for window in windows:
+            window.destroy()
+        dpy.sync()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or replay windowcharmer event traces (recorded with -d --record-trace FILE).")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_dump = sub.add_parser('dump', help="print the records of a trace, and the recorded action latencies")
+    p_dump.add_argument('trace')
+    p_replay = sub.add_parser('replay', help="replay the actions of a trace against a scratch X server, ex: Xvfb :99")
+    p_replay.add_argument('trace')
+    p_replay.add_argument('--display', required=True, help="display to replay against; its windows will be moved around")
+    p_replay.add_argument('--windows', type=int, default=16, help="number of synthetic windows to create")
+    p_replay.add_argument('--realtime', action='store_true', help="keep the recorded timing between actions")
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'dump':
+            dump(args.trace)
+        else:
+            replay(args.trace, args.display, args.windows, args.realtime)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    except:
+        print("Unexpected error:", sys.exc_info()[0])
+        traceback.print_exc()
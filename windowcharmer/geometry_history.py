@@ -0,0 +1,99 @@
+from array import array
+from Xlib import X, error
+from Xlib.protocol import request
+
+# per entry: x, y, width, height (frame position, as used by ConfigureWindow) and max flags (1 = vert, 2 = horz)
+FIELDS = 5
+
+class WindowHistory:
+    __slots__ = ('data', 'head', 'pos', 'size')
+
+    def __init__(self, depth):
+        # one spare slot, so undoing from a full history still has room to save the current geometry for redo
+        self.data = array('i', bytes(4 * FIELDS * (depth + 1)))
+        self.head = 0  # ring index of the oldest entry
+        self.pos = 0   # entries before pos can be undone, entries from pos + 1 up to size can be redone
+        self.size = 0
+
+    def slot(self, i):
+        return (self.head + i) % (len(self.data) // FIELDS)
+
+    def entry(self, slot):
+        return tuple(self.data[slot * FIELDS:(slot + 1) * FIELDS])
+
+class GeometryHistory:
+    def __init__(self, display, atom, root, depth=16):
+        """
+        Per window undo/redo of geometry, in fixed-size rings that live on the registry's WindowRecords.
+
+        Saving the current geometry only queues deferred requests, the replies are collected by commit()
+        once the action has synced anyway, so pushing costs no extra round trips.
+
+        :param depth: Number of undo steps kept per window.
+        """
+        self.d = display
+        self.atom = atom
+        self.root = root
+        self.depth = depth
+        self._pending = []
+
+    def _save(self, window, history, slot):
+        def get_property(atom, length):
+            return request.GetProperty(display=self.d.display, defer=True, delete=False, window=window, property=atom,
+                                       type=X.AnyPropertyType, long_offset=0, long_length=length)
+        self._pending.append((history, slot, (
+            request.TranslateCoords(display=self.d.display, defer=True, src_wid=window, dst_wid=self.root, src_x=0, src_y=0),
+            request.GetGeometry(display=self.d.display, defer=True, drawable=window),
+            get_property(self.atom.extents, 4),
+            get_property(self.atom.state, 32),
+        )))
+
+    def push(self, record):
+        # called before we move a window; a new move drops anything that could have been redone
+        if record.history is None:
+            record.history = WindowHistory(self.depth)
+        h = record.history
+        if h.pos == self.depth:
+            # full: forget the oldest entry
+            h.head = h.slot(1)
+            h.pos -= 1
+        self._save(record.window, h, h.slot(h.pos))
+        h.pos += 1
+        h.size = h.pos
+
+    def undo(self, record):
+        h = record.history
+        if h is None or h.pos == 0:
+            return None
+        self._save(record.window, h, h.slot(h.pos))
+        h.size = max(h.size, h.pos + 1)
+        h.pos -= 1
+        return h.entry(h.slot(h.pos))
+
+    def redo(self, record):
+        h = record.history
+        if h is None or h.pos + 1 >= h.size:
+            return None
+        self._save(record.window, h, h.slot(h.pos))
+        h.pos += 1
+        return h.entry(h.slot(h.pos))
+
+    def commit(self):
+        # call after a sync: all replies have arrived by then, so none of these block
+        pending, self._pending = self._pending, []
+        for history, slot, replies in pending:
+            pos, geom, extents, state = replies
+            try:
+                for reply in replies:
+                    reply.reply()
+                left, top = 0, 0
+                if extents.property_type != X.NONE:
+                    left, _, top, _ = extents.value[1]
+                flags = 0
+                if state.property_type != X.NONE:
+                    states = state.value[1]
+                    flags = int(self.atom.v_max in states) | int(self.atom.h_max in states) << 1
+                history.data[slot * FIELDS:(slot + 1) * FIELDS] = array('i', (pos.x - left, pos.y - top, geom.width, geom.height, flags))
+            except error.XError:
+                # window is gone; its record (and this history) will be pruned by the registry
+                pass
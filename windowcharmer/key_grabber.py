@@ -23,8 +23,9 @@ def get_keycode(dpy, keystring):
     return dpy.keysym_to_keycode(XK.string_to_keysym(keystring))
 
 class KeyGrabber:
-    def __init__(self, dpy, key_combinations, modifier=0):
+    def __init__(self, dpy, key_combinations, modifier=0, trace=None):
         self.dpy = dpy
+        self.trace = trace
         # we accept nicely named keys like "Left", so convert them to keycode integers
         self.keycode_action_map = {get_keycode(dpy, key): value for key, value in key_combinations.items()}
         if 0 in self.keycode_action_map:
@@ -38,6 +39,8 @@ class KeyGrabber:
             while True:
                 event = self.dpy.next_event()
                 if event.type == X.KeyPress:
+                    if self.trace:
+                        self.trace.grab(event.detail, event.state)
                     action_func = self.keycode_action_map.get(event.detail)
                     if action_func:
                         action_func()
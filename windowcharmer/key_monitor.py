@@ -8,9 +8,15 @@ def get_keycode(dpy, keystring):
     return dpy.keysym_to_keycode(XK.string_to_keysym(keystring))
 
 class KeyMonitor:
-    def __init__(self, dpy, callback):
+    def __init__(self, dpy, callback, trace=None, trace_keycodes=()):
+        """
+        :param trace: Optional TraceWriter. Only keys in trace_keycodes are recorded as is,
+                      for any other key just the fact that one was pressed is.
+        """
         self.dpy = dpy
         self.callback = callback
+        self.trace = trace
+        self.trace_keycodes = frozenset(trace_keycodes)
 
     def start(self):
         if not self.dpy.has_extension("RECORD"):
@@ -45,6 +51,11 @@ class KeyMonitor:
             data = reply.data
             while len(data):
                 event, data = rq.EventField(None).parse_binary_value(data, self.dpy.display, None, None)
+                if self.trace:
+                    if event.detail in self.trace_keycodes:
+                        self.trace.key(event.type, event.detail)
+                    elif event.type == X.KeyPress:
+                        self.trace.other_key()
                 self.callback(self.dpy, event)
 
         self.dpy.record_enable_context(ctx, inner_callback)
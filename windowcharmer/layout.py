@@ -0,0 +1,136 @@
+from functools import lru_cache
+
+# zone names per number of splits; full-height zones use the bare column name, ex: "left" or "top-left"
+COLUMN_NAMES = {
+    2: ('left', 'right'),
+    3: ('left', 'center', 'right'),
+    4: ('left', 'center-left', 'center-right', 'right'),
+    5: ('left', 'center-left', 'center', 'center-right', 'right'),
+}
+ROW_NAMES = {
+    2: ('top', 'bottom'),
+    3: ('top', 'middle', 'bottom'),
+}
+
+def split_names(names, count, prefix):
+    return names.get(count) or tuple(f"{prefix}{i + 1}" for i in range(count))
+
+class Layout:
+    def __init__(self, name, columns, rows=2):
+        """
+        Declarative description of a layout. Geometry is computed later by ScreenDimensions.
+
+        :param name: Human readable name, used in log output.
+        :param columns: Relative column widths, ex: (30, 40, 30) for a 40% center column.
+        :param rows: Number of equal-height rows for the half-height zones.
+        """
+        self.name = name
+        self.columns = tuple(columns)
+        self.rows = rows
+        self.column_names = split_names(COLUMN_NAMES, len(self.columns), 'column-')
+        self.row_names = split_names(ROW_NAMES, rows, 'row-')
+
+    def zone_names(self):
+        names = list(self.column_names)
+        if self.rows > 1:
+            names += [f"{row}-{col}" for row in self.row_names for col in self.column_names]
+        return names
+
+    def __repr__(self):
+        return f"Layout({self.name!r})"
+
+# bigger/smaller cycle through these, in order
+SUPPORTED_LAYOUTS = [
+    Layout('2 columns', (1, 1)),
+    Layout('3 even columns', (1, 1, 1)),
+    Layout('40% center', (30, 40, 30)),
+    Layout('45% center', (55, 90, 55)),
+    Layout('50% center', (25, 50, 25)),
+    Layout('55% center', (45, 110, 45)),
+    Layout('60% center', (20, 60, 20)),
+    Layout('65% center', (35, 130, 35)),
+    Layout('4 columns', (1, 1, 1, 1)),
+    Layout('5 columns', (1, 1, 1, 1, 1)),
+]
+
+# every zone name any supported layout knows about, so we can tell "not in this layout" from "invalid"
+ZONE_NAMES = list(dict.fromkeys(name for layout in SUPPORTED_LAYOUTS for name in layout.zone_names()))
+
+class ScreenDimensions:
+    def __init__(self, screen_height, screen_width, layout, measured_height=None, measured_decorations=0, panel_height=64, x_offset=0, y_offset=0):
+        if measured_height is not None:
+            screen_height = measured_height
+        # kept so the same screen can be laid out differently, see nearest_zone()
+        self.params = (screen_height, screen_width, measured_height, measured_decorations, panel_height, x_offset, y_offset)
+        panel_height = panel_height or 0
+
+        self.layout = layout
+        self.h_full = screen_height
+        self.h_decor = measured_decorations
+
+        # columns: split the width at the cumulative weights, so rounding never leaves a gap
+        total = sum(layout.columns)
+        edges = [0]
+        for weight in layout.columns:
+            edges.append(edges[-1] + weight)
+        edges = [screen_width * e // total for e in edges]
+        self.columns = [(x_offset + edges[i], edges[i + 1] - edges[i]) for i in range(len(layout.columns))]
+
+        # rows: every row but the first is pushed down by the panel height
+        n = layout.rows
+        row_height = (screen_height - measured_decorations * (n - 1)) // n
+        self.rows = [(y_offset, row_height)]
+        for i in range(1, n):
+            y = y_offset + screen_height - (n - i) * row_height - (n - i - 1) * measured_decorations + panel_height
+            self.rows.append((y, row_height))
+        self.h_half = row_height
+
+        # zone table: name -> (x, y, width, height, vertically maximized)
+        self.zones = {}
+        self.zone_ids = {}
+        for c, col_name in enumerate(layout.column_names):
+            x, w = self.columns[c]
+            self.zones[col_name] = (x, y_offset, w, self.h_full, 1)
+            self.zone_ids[col_name] = (c, None)
+            if n > 1:
+                for r, row_name in enumerate(layout.row_names):
+                    y, h = self.rows[r]
+                    name = f"{row_name}-{col_name}"
+                    self.zones[name] = (x, y, w, h, 0)
+                    self.zone_ids[name] = (c, r)
+        self.zone_names = {v: k for k, v in self.zone_ids.items()}
+
+    def zone_name(self, column, row):
+        # same format as the zone action names; unknown (None) parts are spelled out, ex: "top-unknown"
+        col_name = self.layout.column_names[column] if column is not None else 'unknown'
+        if row == 'full':
+            return col_name
+        row_name = self.layout.row_names[row] if row is not None else 'unknown'
+        return f"{row_name}-{col_name}"
+
+    def remap_zone(self, zone, old_dim):
+        # find the zone in this layout closest to where `zone` sat in the old layout
+        column, row = old_dim.zone_ids[zone]
+        column = nearest(self.columns, old_dim.columns[column])
+        if row is not None:
+            row = nearest(self.rows, old_dim.rows[row])
+        return self.zone_names[(column, row)]
+
+    def nearest_zone(self, zone):
+        # zones this layout doesn't have, ex: "center" with 4 columns, go to the closest zone it does have
+        if zone in self.zones:
+            return zone
+        layout = next(l for l in SUPPORTED_LAYOUTS if zone in l.zone_names())
+        h, w, measured_height, measured_decorations, panel_height, x_offset, y_offset = self.params
+        other = screen_dimensions(h, w, layout, measured_height, measured_decorations, panel_height, x_offset, y_offset)
+        return self.remap_zone(zone, other)
+
+def nearest(spans, span):
+    # index of the (start, length) span whose middle is closest; ties go to the lower index
+    middle = span[0] + span[1] / 2
+    return min(range(len(spans)), key=lambda i: (abs(spans[i][0] + spans[i][1] / 2 - middle), i))
+
+@lru_cache(maxsize=64)
+def screen_dimensions(screen_height, screen_width, layout, measured_height=None, measured_decorations=0, panel_height=64, x_offset=0, y_offset=0):
+    # zone geometry only changes with these inputs, so compute it once per combination
+    return ScreenDimensions(screen_height, screen_width, layout, measured_height, measured_decorations, panel_height, x_offset, y_offset)
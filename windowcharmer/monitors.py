@@ -0,0 +1,79 @@
+from Xlib import error
+from Xlib.ext import randr
+
+class Monitor:
+    __slots__ = ('name', 'x', 'y', 'width', 'height', 'primary')
+
+    def __init__(self, name, x, y, width, height, primary=False):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.primary = primary
+
+    def contains(self, x, y):
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+    def __repr__(self):
+        return f"Monitor({self.name!r}, {self.width}x{self.height}+{self.x}+{self.y})"
+
+class MonitorCache:
+    def __init__(self, display, root):
+        """
+        Caches RandR monitor geometry; it is only queried again after an RRScreenChangeNotify.
+
+        Without RandR 1.5 (no GetMonitors), the whole root window is treated as one monitor.
+        """
+        self.d = display
+        self.root = root
+        self._monitors = None
+        self.event_type = None
+        # python-xlib always adds xrandr_get_monitors, whether the server knows GetMonitors or not
+        if self.d.has_extension('RANDR'):
+            version = self.d.xrandr_query_version()
+            if (version.major_version, version.minor_version) >= (1, 5):
+                self.root.xrandr_select_input(randr.RRScreenChangeNotifyMask)
+                self.event_type = self.d.extension_event.ScreenChangeNotify
+
+    def handle_event(self, event):
+        if self.event_type is not None and event.type == self.event_type:
+            self._monitors = None
+            return True
+        return False
+
+    @property
+    def monitors(self):
+        if self._monitors is None:
+            self._monitors = self.query()
+            print(f"MONITORS: {self._monitors}")
+        return self._monitors
+
+    def query(self):
+        if self.event_type is not None:
+            try:
+                monitors = [
+                    Monitor(self.d.get_atom_name(m.name), m.x, m.y, m.width_in_pixels, m.height_in_pixels, bool(m.primary))
+                    for m in self.root.xrandr_get_monitors().monitors
+                ]
+            except error.XError as e:
+                print(f"GetMonitors failed, using the whole screen: {e}")
+                monitors = []
+            if monitors:
+                if not any(m.primary for m in monitors):
+                    monitors[0].primary = True
+                return monitors
+        geom = self.root.get_geometry()
+        return [Monitor('screen', 0, 0, geom.width, geom.height, True)]
+
+    def at(self, x, y):
+        # monitor containing the point, or the closest one if it is off screen
+        for monitor in self.monitors:
+            if monitor.contains(x, y):
+                return monitor
+
+        def distance(m):
+            dx = max(m.x - x, 0, x - (m.x + m.width - 1))
+            dy = max(m.y - y, 0, y - (m.y + m.height - 1))
+            return dx * dx + dy * dy
+        return min(self.monitors, key=distance)
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+
+# marker for cached attributes that have not been fetched from the server yet
+UNSET = object()
+
+class WindowRecord:
+    __slots__ = ('id', 'window', 'epoch', 'desktop', 'title', 'wm_class', 'gtk_extents', 'history')
+
+    def __init__(self, wid, window, epoch):
+        self.id = wid
+        self.window = window
+        self.epoch = epoch
+        # these can change at any time, so they are only trusted for the action they were fetched in
+        self.desktop = UNSET
+        self.title = UNSET
+        self.gtk_extents = UNSET
+        # ICCCM: set before the window is mapped and not changed afterwards, so this one is kept
+        self.wm_class = UNSET
+        # GeometryHistory ring, created on the first move
+        self.history = None
+
+class WindowRegistry:
+    def __init__(self, display, max_size=512):
+        """
+        Keeps window resource objects and their cached attributes around between actions.
+
+        We don't select any events on client windows: nothing reads this connection between actions,
+        so they would only pile up in the server's output buffer. Instead, volatile attributes expire
+        with every action (see begin_action) and dead windows are dropped by prune() or the size cap.
+        Hits are counted once per record and action, so hit_rate shows reuse across actions.
+
+        :param display: Xlib display used to create resource objects.
+        :param max_size: Hard cap on tracked windows; least recently used records are evicted first.
+        """
+        self.d = display
+        self.max_size = max_size
+        self._records = OrderedDict()
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def begin_action(self):
+        # lazily expires the volatile attributes of every record, see get()
+        self.epoch += 1
+
+    def get(self, wid):
+        record = self._records.get(wid)
+        if record is not None:
+            self._records.move_to_end(wid)
+            if record.epoch != self.epoch:
+                self.hits += 1
+                record.epoch = self.epoch
+                record.desktop = record.title = record.gtk_extents = UNSET
+            return record
+
+        self.misses += 1
+        window = self.d.create_resource_object('window', wid)
+        record = self._records[wid] = WindowRecord(wid, window, self.epoch)
+        if len(self._records) > self.max_size:
+            self._records.popitem(last=False)
+        return record
+
+    def evict(self, wid):
+        self._records.pop(wid, None)
+
+    def prune(self, live_ids):
+        # drop anything that is no longer in _NET_CLIENT_LIST
+        live_ids = set(live_ids)
+        for wid in [wid for wid in self._records if wid not in live_ids]:
+            del self._records[wid]
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return f"REGISTRY: size={len(self)}/{self.max_size} hits={self.hits} misses={self.misses} hit_rate={self.hit_rate:.2f}"
@@ -1,83 +1,97 @@
 import argparse
+import contextlib
 import json
-from Xlib import X, XK, display, Xatom, protocol
+import multiprocessing
+import os
+from Xlib import X, XK, display, Xatom, error, protocol
+from Xlib.protocol import request
 from Xlib.ext import xtest
 import shelve
 import sys
 import traceback
 import threading
-from threading import *
-from functools import wraps
+from threading import Thread
 import time
 
 from .key_monitor import KeyMonitor, get_keycode
 from .key_grabber import KeyGrabber
 from .sleep_detector import WakeFromSleepDetector
-
-lock = threading.Lock()
-
-def thread_locked(lock):
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            with lock:
-                return func(*args, **kwargs)
-        return wrapper
-    return decorator
-
-class ScreenDimensions:
-    def __init__(self, screen_height, screen_width, center_width, measured_height=None, measured_decorations=0, panel_height=64):
-        if measured_height is not None:
-            screen_height = measured_height
-
-        side_width = (screen_width - center_width) // 2
-        row_height = (screen_height - measured_decorations) // 2
-
-        self.x_left = 0
-        self.x_right = screen_width - side_width
-        self.x_center = (screen_width - center_width) // 2
-        self.y_top = 0
-        self.y_bottom = screen_height - row_height + panel_height
-        self.w_side = side_width
-        self.w_center = center_width
-        self.h_half = row_height
-        self.h_full = screen_height
-
-        self.h_decor = measured_decorations
+from .window_registry import WindowRegistry, UNSET
+from .layout import SUPPORTED_LAYOUTS, ZONE_NAMES, screen_dimensions
+from .auto_placer import AutoPlacer, load_rules, match_rule
+from .monitors import MonitorCache
+from .event_trace import TraceWriter
+from .geometry_history import GeometryHistory
+
+DEFAULT_CONFIG_FILE = '/dev/shm/tilew_state.v2.shelf'
+CONFIG_FILE_TEMPLATE = '/dev/shm/tilew_state.v2.{}.shelf'
+SNAPSHOT_FILE_TEMPLATE = '/dev/shm/tilew_snapshot.{}.json'
+X11_SOCKET_DIR = '/tmp/.X11-unix'
+
+# one WindowManager (and one lock) per display, so several displays can be served by a single process
+window_managers = {}
+display_locks = {}
+display_locks_lock = threading.Lock()
+
+# keymap restore callbacks for running daemons, so the supervisor can clean up after them
+keymap_restorers = {}
+
+# per display event traces, when recording with --record-trace
+traces = {}
+
+def display_lock(display_name):
+    with display_locks_lock:
+        if display_name not in display_locks:
+            display_locks[display_name] = threading.Lock()
+        return display_locks[display_name]
+
+def normalize_display_name(display_name):
+    # ":0" and ":0.0" are the same display, so drop the screen number
+    host, _, number = display_name.rpartition(':')
+    return f"{host}:{number.split('.')[0]}"
+
+def config_file_for(display_name, template=CONFIG_FILE_TEMPLATE, default_file=None):
+    display_name = normalize_display_name(display_name)
+    # $DISPLAY keeps using default_file (if given), so single display setups keep their state
+    default_display = os.environ.get('DISPLAY')
+    if default_file and default_display and display_name == normalize_display_name(default_display):
+        return default_file
+    # keep the file name shell/path friendly, ex: ":1" -> "_1", "host:0.0" -> "host_0"
+    return template.format(display_name.replace(':', '_').replace('/', '_'))
 
 # TODO locking
 class Config:
-    def __init__(self, screen_width, active_desktop, config_file='/dev/shm/tilew_state.v2.shelf'):
-        self.screen_width = screen_width
+    def __init__(self, active_desktop, config_file=DEFAULT_CONFIG_FILE, monitor=None, legacy_keys=False):
         self.active_desktop = active_desktop
         self.config_file = config_file
-        self.supported_ratios = [
-            0,        # only 2 columns
-            (3/9),    # 3 even columns
-            (40/100), # 40% center
-            (45/100), # 45% center
-            (50/100), # 50% center
-            (55/100), # 55% center
-            (60/100), # 60% center
-            (65/100), # 65% center
-        ]
+        # measurements and layout are kept per monitor, ex: "measured_height_DP-1"
+        self.key_suffix = f'_{monitor}' if monitor is not None else ''
+        # for the primary monitor, fall back to the keys saved before there were per monitor keys
+        self.legacy_keys = legacy_keys and bool(self.key_suffix)
+        self.supported_layouts = SUPPORTED_LAYOUTS
         self.reload()
 
     def put(self, k, v):
         with shelve.open(self.config_file) as config:
             config[k] = v
 
+    def get(self, config, k, default):
+        if k + self.key_suffix in config:
+            return config[k + self.key_suffix]
+        if self.legacy_keys:
+            return config.get(k, default)
+        return default
+
     def reload(self):
         with shelve.open(self.config_file) as config:
-            self.measured_height = config.get('measured_height', None)
-            self.measured_decorations = config.get('measured_decorations', 0)
-            self.ratio_idx = config.get(f'ratio_idx_{self.active_desktop}', 2)
-            self.ratio = self.supported_ratios[self.ratio_idx]
-            self.center_width = int(self.screen_width * self.ratio)
+            self.measured_height = self.get(config, 'measured_height', None)
+            self.measured_decorations = self.get(config, 'measured_decorations', 0)
+            self.ratio_idx = self.get(config, f'ratio_idx_{self.active_desktop}', 2) % len(self.supported_layouts)
+            self.layout = self.supported_layouts[self.ratio_idx]
 
     def next_ratio(self, step=1):
-        self.ratio_idx = (self.ratio_idx + len(self.supported_ratios) + step) % len(self.supported_ratios)
-        self.put(f'ratio_idx_{self.active_desktop}', self.ratio_idx)
+        self.ratio_idx = (self.ratio_idx + len(self.supported_layouts) + step) % len(self.supported_layouts)
+        self.put(f'ratio_idx_{self.active_desktop}{self.key_suffix}', self.ratio_idx)
         self.reload()
 
 class AtomCache:
@@ -101,6 +115,7 @@ class AtomCache:
             'client_list_stacking': '_NET_CLIENT_LIST_STACKING',  # back-to-front ordered windows
             'name': '_NET_WM_NAME',
             'name_fallback': 'WM_NAME',
+            'wm_class': 'WM_CLASS',
         }
 
         if name in atom_mapping:
@@ -114,25 +129,24 @@ class AtomCache:
             raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
 
 class WindowManager:
-    def __init__(self):
-        self.d = display.Display()
+    def __init__(self, display_name=None):
+        self.d = display.Display(display_name)
+        self.config_file = config_file_for(self.d.get_display_name(), default_file=DEFAULT_CONFIG_FILE)
+        self.snapshot_file = config_file_for(self.d.get_display_name(), SNAPSHOT_FILE_TEMPLATE)
         self.atom = AtomCache(self.d)
+        self.windows = WindowRegistry(self.d)
         screen = self.d.screen()
         self.root = screen.root
+        self.monitors = MonitorCache(self.d, self.root)
+        self.history = GeometryHistory(self.d, self.atom, self.root)
         self.screenWidth = screen.width_in_pixels
         self.screenHeight = screen.height_in_pixels
+        # zone actions (left, top-center, ...) are looked up in self.dim.zones, see tile()
         self.win_actions = {
-            'left': self.left,
-            'center': self.center,
-            'right': self.right,
-            'top-left': self.top_left,
-            'bottom-left': self.bottom_left,
-            'top-right': self.top_right,
-            'bottom-right': self.bottom_right,
-            'top-center': self.top_center,
-            'bottom-center': self.bottom_center,
             'max': self.max,
             'restore': self.restore,
+            'undo': self.undo,
+            'redo': self.redo,
             'determine_tile_zone': self.determine_tile_zone,
             # 'cycle': self.cycle,
             # 'install': self.install,
@@ -141,30 +155,61 @@ class WindowManager:
         self.desk_actions = {
             'bigger': self.bigger,
             'smaller': self.smaller,
+            'snapshot': self.snapshot,
+            'apply-snapshot': self.apply_snapshot,
         }
+        # counters for auto placement of new windows, see place_new_window()
+        self.placement_stats = {'new': 0, 'placed': 0, 'reconfigures': 0, 'before_map': 0}
 
 
     # TODO fix this; need refactor of state
     def update(self):
+        self.drain_events()
+        self.windows.begin_action()
+        # forget windows that are gone, before a reused id picks up their class and undo history;
+        #  the reply arrives along with the active desktop's, so this costs no extra round trip
+        client_list = self.get_property_deferred(self.root, self.atom.client_list, 4096)
         self.active_desktop = self.get_active_desktop()
+        live_ids = property_value(client_list)
+        if live_ids is not None:
+            self.windows.prune(live_ids)
         self.active_window = self.get_active_window()
-        self.config = Config(self.screenWidth, self.active_desktop)
-        self.maybe_measure(self.active_window)
-        self.panel_height = self.get_panel_height_from_workarea()
+        # everything below is relative to the monitor the active window is on
+        if self.active_window is not None:
+            self.monitor = self.get_window_monitor(self.active_window)
+        else:
+            self.monitor = self.monitors.monitors[0]
+        self.config = Config(self.active_desktop, self.config_file, self.monitor.name, self.monitor.primary)
+        if self.active_window is not None:
+            self.maybe_measure(self.active_window)
+        self.workarea = self.get_workarea()
         self.dim = self.create_dim()
 
     # TODO this is a bad hack to compensate for not being able to cleanly update config -> dim
     def create_dim(self):
-        return ScreenDimensions(self.screenHeight, self.screenWidth, self.config.center_width, self.config.measured_height, self.config.measured_decorations, self.panel_height)
+        return self.dim_for(self.monitor, self.config)
+
+    def dim_for(self, monitor, config=None, desktop=None):
+        if config is None:
+            config = Config(self.active_desktop if desktop is None else desktop, self.config_file, monitor.name, monitor.primary)
+        return screen_dimensions(monitor.height, monitor.width, config.layout, config.measured_height, config.measured_decorations, self.get_panel_height_from_workarea(monitor), monitor.x, monitor.y)
+
+    def drain_events(self):
+        # process whatever the server queued for us since the last action, without blocking
+        while self.d.pending_events():
+            event = self.d.next_event()
+            if self.monitors.handle_event(event):
+                # the root window was resized along with the outputs
+                self.screenWidth, self.screenHeight = event.width_in_pixels, event.height_in_pixels
 
     def maybe_measure(self, window):
         if self.is_window_maximized_vertically(window):
             if not self.get_gtk_frame_extents(window):
                 h, d = self.measure_window(window)
                 if h != self.config.measured_height:
-                    self.config.put('measured_height', h)
+                    self.config.put(f'measured_height{self.config.key_suffix}', h)
                 if d != self.config.measured_decorations:
-                    self.config.put('measured_decorations', d)
+                    self.config.put(f'measured_decorations{self.config.key_suffix}', d)
 
     def measure_window(self, window):
         # Get the window geometry without decorations
@@ -188,10 +233,16 @@ class WindowManager:
         return property.value[0] if property else 0
 
     def get_active_window(self):
-        window_id = self.root.get_full_property(self.atom.window, X.AnyPropertyType).value[0]
-        return self.d.create_resource_object('window', window_id)
+        property = self.root.get_full_property(self.atom.window, X.AnyPropertyType)
+        # 0 (or no property at all) when nothing has focus
+        if not property or not property.value[0]:
+            return None
+        return self.windows.get(property.value[0]).window
+
+    def move_and_resize(self, window, x, y, width, height, dim=None, check_snapped=True):
+        dim = dim or self.dim
+        self.history.push(self.windows.get(window.id))
 
-    def move_and_resize(self, window, x, y, width, height):
         # check if the window has GTK Frame Extents
         #  this is providing some hints about how much space around the window is actually not part of the window content
         #  ex: used for drop shadows
@@ -201,11 +252,11 @@ class WindowManager:
             # and be sure to add the decor height
             # TODO can we measure differently to simplify this?
             delta_w = gtk_fe['left'] + gtk_fe['right']
-            delta_h = gtk_fe['top'] + gtk_fe['bottom'] + self.dim.h_decor
+            delta_h = gtk_fe['top'] + gtk_fe['bottom'] + dim.h_decor
             width += delta_w
             height += delta_h
             x -= delta_w // 2
-            # TODO this isn't needed after adding panel size compensation to dim.y_bottom
+            # TODO this isn't needed after adding panel size compensation to the dim.rows offsets
             #  but why? do we have a subtle math bug?
             # y -= delta_h // 2
 
@@ -228,8 +279,8 @@ class WindowManager:
 
         # hack to detect and remove snapping by other window managers,
         #  though it will do some extra work most of the time, it seems fast/smooth enough
-        if self.is_window_maximized_vertically(window):
-            self.restore(window)
+        if check_snapped and self.is_window_maximized_vertically(window):
+            self.set_max_flags(window, 0, 0)
 
         # Configure the window based on the specified mask and values
         window.configure(value_mask=value_mask, x=x, y=y, width=width, height=height)
@@ -249,49 +300,39 @@ class WindowManager:
     def flush(self):
         self.d.flush()
 
-    def left(self, window):
-        self.set_max_flags(window, 1, 0)
-        self.move_and_resize(window, self.dim.x_left, self.dim.y_top, self.dim.w_side, self.dim.h_full)
-
-    def right(self, window):
-        self.set_max_flags(window, 1, 0)
-        self.move_and_resize(window, self.dim.x_right, self.dim.y_top, self.dim.w_side, self.dim.h_full)
-
-    def top_left(self, window):
-        self.set_max_flags(window, 0, 0)
-        self.move_and_resize(window, self.dim.x_left, self.dim.y_top, self.dim.w_side, self.dim.h_half)
-
-    def bottom_left(self, window):
-        self.set_max_flags(window, 0, 0)
-        self.move_and_resize(window, self.dim.x_left, self.dim.y_bottom, self.dim.w_side, self.dim.h_half)
-
-    def top_right(self, window):
-        self.set_max_flags(window, 0, 0)
-        self.move_and_resize(window, self.dim.x_right, self.dim.y_top, self.dim.w_side, self.dim.h_half)
-
-    def bottom_right(self, window):
-        self.set_max_flags(window, 0, 0)
-        self.move_and_resize(window, self.dim.x_right, self.dim.y_bottom, self.dim.w_side, self.dim.h_half)
-
-    def center(self, window):
-        if self.config.center_width > 0:
-            self.set_max_flags(window, 1, 0)
-            self.move_and_resize(window, self.dim.x_center, self.dim.y_top, self.dim.w_center, self.dim.h_full)
-
-    def top_center(self, window):
-        if self.config.center_width > 0:
-            self.set_max_flags(window, 0, 0)
-            self.move_and_resize(window, self.dim.x_center, self.dim.y_top, self.dim.w_center, self.dim.h_half)
-
-    def bottom_center(self, window):
-        if self.config.center_width > 0:
-            self.set_max_flags(window, 0, 0)
-            self.move_and_resize(window, self.dim.x_center, self.dim.y_bottom, self.dim.w_center, self.dim.h_half)
+    def tile(self, window, zone, dim=None, check_snapped=True):
+        dim = dim or self.dim
+        if zone not in dim.zones:
+            # ex: "center" (Down, Numpad 5) in the 4 column layout tiles to center-left
+            nearest = dim.nearest_zone(zone)
+            print(f"Zone {zone} is not part of layout {dim.layout.name}, using {nearest}")
+            zone = nearest
+        x, y, w, h, v_max = dim.zones[zone]
+        self.set_max_flags(window, v_max, 0)
+        self.move_and_resize(window, x, y, w, h, dim, check_snapped)
+
+    def undo(self, window):
+        self.apply_history_entry(window, self.history.undo(self.windows.get(window.id)), 'undo')
+
+    def redo(self, window):
+        self.apply_history_entry(window, self.history.redo(self.windows.get(window.id)), 'redo')
+
+    def apply_history_entry(self, window, entry, what):
+        # width 0 means we never got the geometry, ex: the window was being destroyed
+        if entry is None or entry[2] == 0:
+            print(f"Nothing to {what}")
+            return
+        x, y, w, h, flags = entry
+        self.set_max_flags(window, flags & 1, flags >> 1 & 1)
+        if flags != 3:
+            window.configure(x=x, y=y, width=w, height=h)
 
     def max(self, window, v=1, h=1):
+        self.history.push(self.windows.get(window.id))
         self.set_max_flags(window, 1, 1)
 
     def restore(self, window):
+        self.history.push(self.windows.get(window.id))
         self.set_max_flags(window, 0, 0)
 
     def bigger(self):
@@ -302,35 +343,165 @@ class WindowManager:
 
     def resize_all_windows(self, step):
         # get window zones before we change the dimensions that will be used to detect them
-        window_zones = [(win, self.determine_tile_zone(win)) for win in self.list_windows()]
+        #  only windows on the active monitor are affected, since the layout is per monitor
+        windows = [win for win in self.list_windows() if self.get_window_monitor(win) is self.monitor]
+        window_zones = [(win, self.determine_tile_zone(win)) for win in windows]
         # update zone sizes
+        old_dim = self.dim
         self.config.next_ratio(step)
         self.dim = self.create_dim() # TODO refactor me
+        print(f"LAYOUT: {self.config.layout.name}")
 
-        # no center zone in ratio 0, so move it left
-        #  TODO refactor this so we don't check over and over
+        # zones that don't exist in the new layout move to the nearest one that does
         for win, zone in window_zones:
-            if self.config.ratio_idx == 0:
-                zone = zone.replace("center", "left")
             if "unknown" not in zone:
-                self.win_actions[zone](win)
+                self.tile(win, self.dim.remap_zone(zone, old_dim))
             else:
                 print(f"UNKNOWN ZONE: {win} {win.get_wm_name()}")
 
         self.flush()
 
+    def snapshot(self):
+        # record every window on the current desktop: by zone where it's tiled, by raw geometry otherwise
+        #  like inventory(), everything is asked for in one burst of deferred requests before reading any reply
+        queries = []
+        for window in self.list_windows(all_desktops=True):
+            replies = self.query_window_info(window)
+            replies['extents'] = self.get_property_deferred(window, self.atom.extents, 4)
+            queries.append((window, replies.pop('geometry'), replies.pop('position'), replies))
+
+        dims = {}
+        records = []
+        for window, geom, pos, replies in queries:
+            try:
+                values = {name: property_value(reply) for name, reply in replies.items()}
+                geom.reply()
+                pos.reply()
+            except error.XError:
+                # window went away while we were asking about it
+                continue
+            desktop = values['desktop'][0] if values['desktop'] else None
+            if desktop != self.active_desktop:
+                continue
+
+            x, y = abs(pos.x), abs(pos.y)
+            monitor = self.monitors.at(x + geom.width // 2, y + geom.height // 2)
+            if monitor.name not in dims:
+                dims[monitor.name] = self.dim if monitor is self.monitor else self.dim_for(monitor)
+            state = values['state'] or ()
+            v_max, h_max = int(self.atom.v_max in state), int(self.atom.h_max in state)
+            zone = self.zone_from_geometry(dims[monitor.name], x, y, geom.width, geom.height, bool(v_max))
+            # store the frame position, which is what a ConfigureRequest positions
+            left, _, top, _ = values['extents'] or (0, 0, 0, 0)
+
+            title = values['name'] or values['name_fallback'] or b"Unknown"
+            record = self.windows.get(window.id)
+            record.title = title if isinstance(title, bytes) else title.encode('utf-8')
+            record.wm_class = parse_wm_class(values['class'])
+            record.desktop = desktop
+            records.append({
+                'id': window.id,
+                'class': list(record.wm_class),
+                'title': record.title.decode('utf-8', 'replace'),
+                'desktop': desktop,
+                'monitor': monitor.name,
+                'zone': zone if 'unknown' not in zone else None,
+                'geometry': [x - left, y - top, geom.width, geom.height],
+                'max': [v_max, h_max],
+            })
+
+        snapshots = self.load_snapshots()
+        snapshots[str(self.active_desktop)] = records
+        with open(self.snapshot_file, 'w') as f:
+            json.dump(snapshots, f, separators=(',', ':'))
+        print(f"SNAPSHOT: saved {len(records)} windows of desktop {self.active_desktop} to {self.snapshot_file}")
+
+    def load_snapshots(self):
+        try:
+            with open(self.snapshot_file) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def apply_snapshot(self):
+        records = self.load_snapshots().get(str(self.active_desktop))
+        if not records:
+            print(f"SNAPSHOT: nothing saved for desktop {self.active_desktop} in {self.snapshot_file}")
+            return
+
+        # match by window id first, then fall back to WM_CLASS + title, then WM_CLASS alone
+        #  (window ids survive a WM restart, but not an application restart)
+        windows = {w.id: w for w in self.list_windows(all_desktops=True)}
+        matches = []
+        unmatched = []
+        for rec in records:
+            window = windows.pop(rec['id'], None)
+            if window is not None:
+                matches.append((rec, window))
+            else:
+                unmatched.append(rec)
+        if unmatched:
+            self.prefetch(windows.values(), 'wm_class', 'title')
+        for match_title in (True, False):
+            remaining = []
+            for rec in unmatched:
+                for wid, window in windows.items():
+                    if list(self.get_window_class(window)) != rec['class']:
+                        continue
+                    if match_title and self.get_window_title(window).decode('utf-8', 'replace') != rec['title']:
+                        continue
+                    matches.append((rec, windows.pop(wid)))
+                    break
+                else:
+                    remaining.append(rec)
+            unmatched = remaining
+
+        # the per window properties we still need are fetched in one burst; after that the loop
+        #  below only queues requests, so the whole restore goes out in one flush while we hold the server grab
+        self.prefetch([window for _, window in matches], 'desktop', 'gtk_extents')
+        monitors = {m.name: m for m in self.monitors.monitors}
+        dims = {}
+        for rec, window in matches:
+            if rec['desktop'] is not None and self.get_window_desktop(window) != rec['desktop']:
+                self.send_client_message(window, self.atom.wm_desktop, [rec['desktop'], 2, 0, 0, 0])
+
+            monitor = monitors.get(rec['monitor'])
+            if rec['zone'] and monitor:
+                if monitor.name not in dims:
+                    dims[monitor.name] = self.dim if monitor is self.monitor else self.dim_for(monitor)
+                if rec['zone'] in dims[monitor.name].zones:
+                    self.tile(window, rec['zone'], dims[monitor.name], check_snapped=False)
+                    continue
+
+            v, h = rec['max']
+            self.set_max_flags(window, v, h)
+            if not (v and h):
+                x, y, w, height = rec['geometry']
+                window.configure(x=x, y=y, width=w, height=height)
+
+        self.flush()
+        print(f"SNAPSHOT: restored {len(matches)} of {len(records)} windows on desktop {self.active_desktop}")
+
     def is_window_maximized_vertically(self, window):
         state = window.get_full_property(self.atom.state, X.AnyPropertyType)        
         if state:
             return self.atom.v_max in state.value
         return False
 
-    def get_gtk_frame_extents(self, window):        
+    def get_gtk_frame_extents(self, window):
+        record = self.windows.get(window.id)
+        if record.gtk_extents is UNSET:
+            record.gtk_extents = self._fetch_gtk_frame_extents(window)
+        return record.gtk_extents
+
+    def _fetch_gtk_frame_extents(self, window):
         # Try to get the _GTK_FRAME_EXTENTS property of the active window
         frame_extents = window.get_full_property(self.atom.gtk_extents, X.AnyPropertyType)
-        if frame_extents:
+        return self._gtk_frame_extents(frame_extents.value if frame_extents else None)
+
+    def _gtk_frame_extents(self, extents):
+        if extents:
             # The property value is an array of 4 integers: [left, right, top, bottom]
-            extents = frame_extents.value
             return {
                 'left': extents[0],
                 'right': extents[1],
@@ -340,6 +511,46 @@ class WindowManager:
         else:
             return None
 
+    def get_property_deferred(self, window, atom, length=1024):
+        # deferred requests only block once their reply is read, so many of them go out in one flush
+        return request.GetProperty(display=self.d.display, defer=True, delete=False, window=window, property=atom,
+                                   type=X.AnyPropertyType, long_offset=0, long_length=length)
+
+    def prefetch(self, windows, *attributes):
+        """
+        Fills the registry's cached attributes of many windows with one pipelined burst,
+        instead of a round trip per window and attribute.
+
+        :param attributes: WindowRecord attributes, any of 'desktop', 'title', 'wm_class', 'gtk_extents'.
+        """
+        atoms = {
+            'desktop': (self.atom.wm_desktop,),
+            'title': (self.atom.name, self.atom.name_fallback),
+            'wm_class': (self.atom.wm_class,),
+            'gtk_extents': (self.atom.gtk_extents,),
+        }
+        pending = []
+        for window in windows:
+            record = self.windows.get(window.id)
+            for attr in attributes:
+                if getattr(record, attr) is UNSET:
+                    pending.append((record, attr, [self.get_property_deferred(window, atom) for atom in atoms[attr]]))
+
+        for record, attr, replies in pending:
+            try:
+                values = [property_value(reply) for reply in replies]
+            except error.XError:
+                # window is gone; leave it to the blocking getters
+                continue
+            if attr == 'desktop':
+                record.desktop = values[0][0] if values[0] else None
+            elif attr == 'title':
+                record.title = values[0] or values[1] or b"Unknown"
+            elif attr == 'wm_class':
+                record.wm_class = parse_wm_class(values[0])
+            elif attr == 'gtk_extents':
+                record.gtk_extents = self._gtk_frame_extents(values[0])
+
     def list_windows(self, all_desktops=False):
         window_list = []
         # try to get a sorted window list
@@ -349,35 +560,49 @@ class WindowManager:
             window_ids = self.root.get_full_property(self.atom.client_list, X.AnyPropertyType)
 
         if window_ids:
-            window_list = [self.d.create_resource_object('window', wid) for wid in window_ids.value]
+            self.windows.prune(window_ids.value)
+            window_list = [self.windows.get(wid).window for wid in window_ids.value]
             # filter windows by the current desktop
             if not all_desktops:
                 window_list = [w for w in window_list if self.get_window_desktop(w) == self.active_desktop]
         return window_list
 
     def get_window_desktop(self, window):
-        desktop = window.get_full_property(self.atom.wm_desktop, X.AnyPropertyType)
-        if desktop:
-            return desktop.value[0]
-        return None
+        record = self.windows.get(window.id)
+        if record.desktop is UNSET:
+            desktop = window.get_full_property(self.atom.wm_desktop, X.AnyPropertyType)
+            record.desktop = desktop.value[0] if desktop else None
+        return record.desktop
+
+    def get_workarea(self):
+        workarea = self.root.get_full_property(self.atom.workarea, X.AnyPropertyType)
+        return self._workarea(workarea.value if workarea else None)
+
+    def _workarea(self, workarea):
+        # x, y, width, height of the current desktop's work area, spanning all monitors
+        if not workarea:
+            return None
+        start = 4 * self.active_desktop
+        if start + 4 > len(workarea):
+            start = 0
+        return tuple(workarea[start:start + 4])
 
-    def get_panel_height_from_workarea(self):
-        d = display.Display()
-        root = d.screen().root
-        net_workarea = d.intern_atom('_NET_WORKAREA')
-        workarea = root.get_full_property(net_workarea, X.AnyPropertyType)
-
-        if workarea is not None:
-            # Assuming the panel is at the top or bottom and not on the sides,
-            # and that there's only one panel, or they have the same total height.
-            workarea_height = workarea.value[3]
-            screen_height = d.screen().height_in_pixels
-
-            # Calculate panel height
-            panel_height = (screen_height - workarea_height)
-            return panel_height
-        else:
+    def get_panel_height_from_workarea(self, monitor):
+        if self.workarea is None:
             return None
+        # Assuming the panel is at the top or bottom and not on the sides,
+        # and that there's only one panel, or they have the same total height.
+        # The work area covers all monitors, so only count the part of it on this one
+        _, y, _, height = self.workarea
+        top = max(y, monitor.y)
+        bottom = min(y + height, monitor.y + monitor.height)
+        return monitor.height - max(bottom - top, 0)
+
+    def get_window_monitor(self, window):
+        # the monitor containing the middle of the window
+        x, y = self.get_window_position(window)
+        geom = window.get_geometry()
+        return self.monitors.at(x + geom.width // 2, y + geom.height // 2)
 
     def get_window_position(self, window):
         root_window = self.d.screen().root
@@ -388,50 +613,200 @@ class WindowManager:
         else:
             return None, None
 
-    def determine_tile_zone(self, window, d_x=128, d_y=128, d_w=128, d_h=128):
+    def determine_tile_zone(self, window, dim=None, d_x=128, d_y=128, d_w=128, d_h=128):
+        dim = dim or self.dim
         x, y = self.get_window_position(window)
         geom = window.get_geometry()
         w, h = geom.width, geom.height
 
+        ret = self.zone_from_geometry(dim, x, y, w, h, self.is_window_maximized_vertically(window), d_x, d_y, d_w, d_h)
+        print(f"ZONE: {ret}")
+        return ret
+
+    @staticmethod
+    def zone_from_geometry(dim, x, y, w, h, v_max=False, d_x=128, d_y=128, d_w=128, d_h=128):
         # Helper function to check if a value is within a deviation range
         def within(value, target, deviation):
             return target - deviation <= value <= target + deviation
 
-        horizontal_pos = 'unknown'
-        vertical_pos = 'unknown'
-        
+        column = None
+        row = None
+
         # Determine vertical position, and whether the height implied we're tiled
-        if self.is_window_maximized_vertically(window) or within(h, self.dim.h_full, d_h):
-            vertical_pos = 'full'
-        elif within(h, self.dim.h_half, d_h):
-            if within(y, self.dim.y_top, d_y):
-                vertical_pos = 'top'
-            elif within(y, self.dim.y_bottom, d_y):
-                vertical_pos = 'bottom'
+        if v_max or within(h, dim.h_full, d_h):
+            row = 'full'
+        else:
+            for i, (row_y, row_h) in enumerate(dim.rows):
+                if within(h, row_h, d_h) and within(y, row_y, d_y):
+                    row = i
+                    break
 
         # Determine horizontal position, and whether the width implies we're tiled
-        if within(w, self.dim.w_side, d_w):
-            if within(x, self.dim.x_left, d_x):
-                horizontal_pos = 'left'
-            elif within(x, self.dim.x_right, d_x):
-                horizontal_pos = 'right'
-            elif within(x, self.dim.x_center, d_x):
-                horizontal_pos = 'center'
-        elif within(w, self.dim.w_center, d_w) and within(x, self.dim.x_center, d_x):
-            horizontal_pos = 'center'
-
-        # TODO this replace() is lazy
-        ret = f"{vertical_pos}-{horizontal_pos}".replace("full-", "")
-        print(f"ZONE: {ret}")
-        return ret
+        for i, (col_x, col_w) in enumerate(dim.columns):
+            if within(w, col_w, d_w) and within(x, col_x, d_x):
+                column = i
+                break
+
+        return dim.zone_name(column, row)
 
     def get_window_title(self, window):
-        name = window.get_full_property(self.atom.name, 0)
-        if not name:
-            name = window.get_full_property(self.atom.name_fallback, 0)
-        if not name:
-            name = "Unknown"
-        return name.value
+        record = self.windows.get(window.id)
+        if record.title is UNSET:
+            name = window.get_full_property(self.atom.name, 0)
+            if not name:
+                name = window.get_full_property(self.atom.name_fallback, 0)
+            record.title = name.value if name else b"Unknown"
+        return record.title
+
+    def get_window_class(self, window):
+        record = self.windows.get(window.id)
+        if record.wm_class is UNSET:
+            # (instance, class), ex: ("navigator", "firefox")
+            record.wm_class = window.get_wm_class() or ()
+        return record.wm_class
+
+    def place_new_window(self, window, rules):
+        """
+        Tiles a window the WM just started managing, if one of the rules matches it.
+
+        Unlike update() and the other actions, this asks for everything it needs in a single burst of deferred
+        requests, and nothing about the active window: the sooner the window is configured, the less likely
+        the WM already painted it at its initial position.
+        """
+        self.placement_stats['new'] += 1
+        properties = self.query_window_info(window)
+        geom, pos = properties.pop('geometry'), properties.pop('position')
+        properties['gtk_extents'] = self.get_property_deferred(window, self.atom.gtk_extents)
+        properties['current_desktop'] = self.get_property_deferred(self.root, self.atom.current_desktop, 1)
+        properties['workarea'] = self.get_property_deferred(self.root, self.atom.workarea)
+        attributes = request.GetWindowAttributes(display=self.d.display, defer=True, window=window)
+        try:
+            values = {name: property_value(reply) for name, reply in properties.items()}
+            for reply in (geom, pos, attributes):
+                reply.reply()
+        except error.XError:
+            print(f"AUTOPLACE: window 0x{window.id:x} is already gone")
+            return
+
+        self.active_desktop = values['current_desktop'][0] if values['current_desktop'] else 0
+        self.workarea = self._workarea(values['workarea'])
+        # we have these now anyway, so the getters used by tile() don't need to ask again
+        record = self.windows.get(window.id)
+        record.title = values['name'] or values['name_fallback'] or b"Unknown"
+        record.wm_class = parse_wm_class(values['class'])
+        record.gtk_extents = self._gtk_frame_extents(values['gtk_extents'])
+        record.desktop = values['desktop'][0] if values['desktop'] else None
+
+        title = record.title.decode('utf-8', 'replace')
+        zone = match_rule(rules, record.wm_class, title)
+        if zone is None:
+            return
+        self.placement_stats['placed'] += 1
+        # zones of the monitor the WM put the new window on, not the one of the active window
+        x, y = abs(pos.x), abs(pos.y)
+        dim = self.dim_for(self.monitors.at(x + geom.width // 2, y + geom.height // 2))
+        v_max = self.atom.v_max in (values['state'] or ())
+        target = zone if zone in dim.zones else dim.nearest_zone(zone)
+        if target == self.zone_from_geometry(dim, x, y, geom.width, geom.height, v_max):
+            # the WM's initial placement already matches, no need to touch the window
+            print(f"AUTOPLACE: '{title}' already in {zone}")
+            return
+        self.placement_stats['reconfigures'] += 1
+        # if the window isn't mapped yet, the WM never has to draw it at its initial position,
+        #  so the move doesn't cause a visible jump after the first paint
+        if attributes.map_state == X.IsUnmapped:
+            self.placement_stats['before_map'] += 1
+        # we already know whether it is snapped, so only let tile() look again when it is
+        self.tile(window, zone, dim, check_snapped=v_max)
+        stats = self.placement_stats
+        print(f"AUTOPLACE: '{title}' -> {zone} (new={stats['new']} placed={stats['placed']} "
+              f"reconfigures={stats['reconfigures']} before_map={stats['before_map']})")
+
+    def query_window_info(self, window):
+        # deferred requests only block once their reply is read, so a whole batch of windows goes out in one flush
+        def get_property(atom, length=1024):
+            return self.get_property_deferred(window, atom, length)
+        return {
+            'name': get_property(self.atom.name),
+            'name_fallback': get_property(self.atom.name_fallback),
+            'class': get_property(self.atom.wm_class),
+            'desktop': get_property(self.atom.wm_desktop, 1),
+            'state': get_property(self.atom.state, 32),
+            'geometry': request.GetGeometry(display=self.d.display, defer=True, drawable=window),
+            'position': request.TranslateCoords(display=self.d.display, defer=True, src_wid=window, dst_wid=self.root, src_x=0, src_y=0),
+        }
+
+    def inventory(self, out, desktops=None, zones=None, batch_size=64):
+        """
+        Writes one JSON record per window (newline delimited) to `out`, as the replies for each batch arrive.
+
+        :param desktops: Only include windows on these desktops (default: all).
+        :param zones: Only include windows tiled in one of these zones (default: all, including untiled windows).
+        """
+        windows = self.list_windows(all_desktops=True)
+        dims = {}
+        atom_names = {}
+
+        def value(prop):
+            if prop.property_type == X.NONE:
+                return None
+            return prop.value[1]
+
+        def text(data):
+            return data.decode('utf-8', 'replace') if isinstance(data, bytes) else data
+
+        for start in range(0, len(windows), batch_size):
+            batch = [(window, self.query_window_info(window)) for window in windows[start:start + batch_size]]
+            for window, replies in batch:
+                try:
+                    for reply in replies.values():
+                        reply.reply()
+                except error.XError:
+                    # window went away while we were asking about it
+                    continue
+
+                desktop = value(replies['desktop'])
+                desktop = desktop[0] if desktop else None
+                if desktops is not None and desktop not in desktops:
+                    continue
+
+                state = value(replies['state']) or ()
+                for atom in state:
+                    if atom not in atom_names:
+                        atom_names[atom] = self.d.get_atom_name(atom)
+                state = [atom_names[a].replace('_NET_WM_STATE_', '').lower() for a in state]
+
+                geom = replies['geometry']
+                pos = replies['position']
+                monitor = self.monitors.at(pos.x + geom.width // 2, pos.y + geom.height // 2)
+                if (desktop, monitor.name) not in dims:
+                    dims[(desktop, monitor.name)] = self.dim_for(monitor, desktop=desktop)
+                zone = self.zone_from_geometry(dims[(desktop, monitor.name)], pos.x, pos.y, geom.width, geom.height,
+                                               'maximized_vert' in state)
+                zone = zone if 'unknown' not in zone else None
+                if zones is not None and zone not in zones:
+                    continue
+
+                title = value(replies['name']) or value(replies['name_fallback']) or b"Unknown"
+                wm_class = parse_wm_class(value(replies['class']))
+
+                # we have these now anyway, so save the next action the round trips
+                record = self.windows.get(window.id)
+                record.title = title if isinstance(title, bytes) else title.encode('utf-8')
+                record.wm_class = wm_class
+                record.desktop = desktop
+
+                out.write(json.dumps({
+                    'id': window.id,
+                    'title': text(title),
+                    'class': list(wm_class),
+                    'desktop': desktop,
+                    'monitor': monitor.name,
+                    'geometry': [pos.x, pos.y, geom.width, geom.height],
+                    'zone': zone,
+                    'state': state,
+                }, separators=(',', ':')) + '\n')
+            out.flush()
 
     def print_window_positions(self):
         for window in self.list_windows():
@@ -441,33 +816,99 @@ class WindowManager:
             geom = window.get_geometry()
             w, h = geom.width, geom.height
             print(f"title='{title.decode('utf-8')}' zone={zone} pos=({x},{y}) size={w}x{h}")
+        print(self.windows.stats())
 
     def test(self, window):
         self.print_window_positions()
 
-@thread_locked(lock)
-def do_action(action):
+def property_value(reply):
+    # value of a (deferred) GetProperty reply, None if the property isn't set
+    reply.reply()
+    if reply.property_type == X.NONE:
+        return None
+    return reply.value[1]
+
+def parse_wm_class(data):
+    # WM_CLASS is "instance\0class\0", ex: ("navigator", "firefox")
+    if not data:
+        return ()
+    if isinstance(data, bytes):
+        data = data.decode('latin-1')
+    return tuple(part for part in data.split('\0') if part)
+
+def do_action(action, display_name=None):
+    with display_lock(display_name):
+        trace = traces.get(display_name)
+        if trace is None:
+            _do_action(action, display_name)
+            return
+        start = time.perf_counter()
+        try:
+            _do_action(action, display_name)
+        finally:
+            trace.action(action, time.perf_counter() - start)
+            trace.flush()
+
+def get_window_manager(display_name):
     # we must instantiate this here because xlib cares about what thread we're on
-    global wm
-    if not 'wm' in globals():
-        wm = WindowManager()
+    wm = window_managers.get(display_name)
+    if wm is None:
+        wm = window_managers[display_name] = WindowManager(display_name)
+    return wm
+
+def _do_action(action, display_name):
+    wm = get_window_manager(display_name)
     try:
         wm.update()
         wm.d.grab_server()
         # Call the corresponding function based on the action argument
-        if action in wm.win_actions:
-            wm.win_actions[action](wm.get_active_window())
+        if (action in ZONE_NAMES or action in wm.win_actions) and wm.active_window is None:
+            print("No active window")
+        elif action in ZONE_NAMES:
+            wm.tile(wm.active_window, action)
+            wm.flush()
+        elif action in wm.win_actions:
+            wm.win_actions[action](wm.active_window)
             wm.flush()
         elif action in wm.desk_actions:
             wm.desk_actions[action]()
         else:
             print(f"Invalid action: {action}")
+        print(wm.windows.stats())
     except:
         print("Unexpected error:", sys.exc_info()[0])
         traceback.print_exc()
     finally:
         wm.d.ungrab_server()
         wm.d.sync()
+        wm.history.commit()
+
+def place_window(window_id, rules, display_name=None):
+    with display_lock(display_name):
+        wm = get_window_manager(display_name)
+        try:
+            # no update(): placement doesn't need the active window, and every round trip gives the WM time to paint
+            wm.d.grab_server()
+            wm.drain_events()
+            wm.windows.begin_action()
+            # the id may have belonged to a window that is gone by now
+            wm.windows.evict(window_id)
+            wm.place_new_window(wm.windows.get(window_id).window, rules)
+            wm.flush()
+        except:
+            print("Unexpected error:", sys.exc_info()[0])
+            traceback.print_exc()
+        finally:
+            wm.d.ungrab_server()
+            wm.d.sync()
+            wm.history.commit()
+
+def print_inventory(out, display_name=None, desktops=None, zones=None):
+    # read only, so no server grab: the X server stays responsive while we stream
+    with display_lock(display_name):
+        wm = get_window_manager(display_name)
+        wm.update()
+        wm.inventory(out, desktops, zones)
 
 def change_keyboard_mapping(dpy, keycode, new_keysym):
     """Change the keyboard mapping for a single keycode."""
@@ -480,36 +921,38 @@ def simulate_key_press_release(dpy, keycode):
     xtest.fake_input(dpy, X.KeyRelease, keycode)
     dpy.flush()
 
-def daemonize():
+def daemonize(display_name=None, rules=None, trace_file=None):
     # modifier is always Super_L
     key_combinations = {
-        'Up':           lambda: do_action("max"),           # Up
-        'Down':         lambda: do_action("center"),        # Down
-        'Left':         lambda: do_action("left"),          # Left
-        'Right':        lambda: do_action("right"),         # Right
-        'space':        lambda: do_action("restore"),       # spacebar
-
-        'KP_Home':      lambda: do_action("top-left"),      # Numpad 7
-        'KP_Up':        lambda: do_action("top-center"),    # Numpad 8
-        'KP_Page_Up':   lambda: do_action("top-right"),     # Numpad 9
-        'KP_Left':      lambda: do_action("left"),          # Numpad 4
-        'KP_Begin':     lambda: do_action("center"),        # Numpad 5
-        'KP_Right':     lambda: do_action("right"),         # Numpad 6
-        'KP_End':       lambda: do_action("bottom-left"),   # Numpad 1
-        'KP_Down':      lambda: do_action("bottom-center"), # Numpad 2
-        'KP_Page_Down': lambda: do_action("bottom-right"),  # Numpad 3
-        'KP_Insert':    lambda: do_action("restore"),       # Numpad 0
-
-        'KP_Prior':     lambda: do_action("top-right"),     # Numpad 9 (alternate keyboard layout)
-        'KP_Next':      lambda: do_action("bottom-right"),  # Numpad 3 (alternate keyboard layout)
-
-        'KP_Add':       lambda: do_action("bigger"),        # Numpad +
-        'KP_Subtract':  lambda: do_action("smaller"),       # Numpad -
-
-        'BackSpace':    lambda: sys.exit(),                 # backspace
+        'Up':           lambda: do_action("max", display_name),           # Up
+        'Down':         lambda: do_action("center", display_name),        # Down
+        'Left':         lambda: do_action("left", display_name),          # Left
+        'Right':        lambda: do_action("right", display_name),         # Right
+        'space':        lambda: do_action("restore", display_name),       # spacebar
+        'z':            lambda: do_action("undo", display_name),          # z
+        'y':            lambda: do_action("redo", display_name),          # y
+
+        'KP_Home':      lambda: do_action("top-left", display_name),      # Numpad 7
+        'KP_Up':        lambda: do_action("top-center", display_name),    # Numpad 8
+        'KP_Page_Up':   lambda: do_action("top-right", display_name),     # Numpad 9
+        'KP_Left':      lambda: do_action("left", display_name),          # Numpad 4
+        'KP_Begin':     lambda: do_action("center", display_name),        # Numpad 5
+        'KP_Right':     lambda: do_action("right", display_name),         # Numpad 6
+        'KP_End':       lambda: do_action("bottom-left", display_name),   # Numpad 1
+        'KP_Down':      lambda: do_action("bottom-center", display_name), # Numpad 2
+        'KP_Page_Down': lambda: do_action("bottom-right", display_name),  # Numpad 3
+        'KP_Insert':    lambda: do_action("restore", display_name),       # Numpad 0
+
+        'KP_Prior':     lambda: do_action("top-right", display_name),     # Numpad 9 (alternate keyboard layout)
+        'KP_Next':      lambda: do_action("bottom-right", display_name),  # Numpad 3 (alternate keyboard layout)
+
+        'KP_Add':       lambda: do_action("bigger", display_name),        # Numpad +
+        'KP_Subtract':  lambda: do_action("smaller", display_name),       # Numpad -
+
+        'BackSpace':    lambda: sys.exit(),                               # backspace
     }
 
-    daemon_dpy = display.Display()
+    daemon_dpy = display.Display(display_name)
     super_l_keycode = get_keycode(daemon_dpy, 'Super_L')
     hyper_l_keysym = XK.string_to_keysym('Hyper_L')
     hyper_l_keycode = get_keycode(daemon_dpy, 'Hyper_L')
@@ -527,7 +970,23 @@ def daemonize():
         print("no mapping for Hyper_L! this means we can't simulate it, or keycodes have been misconfigured; exiting")
         sys.exit(1)
 
+    def restore_keymap():
+        # Restore the original mapping for Super_L
+        print("Restoring Super_L/Hyper_L mapping back to original...")
+        # new dpy here, otherwise we hang
+        dpy = display.Display(display_name)
+        dpy.change_keyboard_mapping(super_l_keycode, super_l_orig)
+        dpy.change_keyboard_mapping(hyper_l_keycode, hyper_l_orig)
+        dpy.sync()
+        dpy.close()
+
+    keymap_restorers[display_name] = restore_keymap
+    trace = None
     try:
+        if trace_file:
+            print(f"Recording event trace to {trace_file}")
+            trace = traces[display_name] = TraceWriter(trace_file)
+
         # Remap Super_L to Hyper_L
         # This allows us to grab Super key combos without messing up the application menu shortcut
         print("Swapping Super_L and Hyper_L...")
@@ -569,7 +1028,7 @@ def daemonize():
                     key_pressed_while_super_down = True
 
         # make sure to use a different dpy with this one, otherwise there is a CPU usage bug
-        monitor = KeyMonitor(display.Display(), monitor_callback)
+        monitor = KeyMonitor(display.Display(display_name), monitor_callback, trace, [super_l_keycode])
         t1 = Thread(target=monitor.start) 
         t1.daemon = True
         t1.start()
@@ -586,9 +1045,16 @@ def daemonize():
         t2.daemon = True
         t2.start()
 
+        # tile new windows as soon as the WM starts managing them, based on rules
+        if rules:
+            placer = AutoPlacer(display.Display(display_name), lambda wid: place_window(wid, rules, display_name))
+            t3 = Thread(target=placer.start)
+            t3.daemon = True
+            t3.start()
+
 
         # grab actual keybindings
-        grabber = KeyGrabber(daemon_dpy, key_combinations, modifier=X.Mod4Mask|X.Mod5Mask)
+        grabber = KeyGrabber(daemon_dpy, key_combinations, modifier=X.Mod4Mask|X.Mod5Mask, trace=trace)
         grabber.start()
 
 
@@ -598,40 +1064,139 @@ def daemonize():
         print("Unexpected error:", sys.exc_info()[0])
         traceback.print_exc()
     finally:
-        # Restore the original mapping for Super_L
-        print("Restoring Super_L/Hyper_L mapping back to original...")
-        # new dpy here, otherwise we hang 
-        dpy = display.Display()
-        dpy.change_keyboard_mapping(super_l_keycode, super_l_orig)
-        dpy.change_keyboard_mapping(hyper_l_keycode, hyper_l_orig)
-        dpy.sync()
+        if trace:
+            traces.pop(display_name, None)
+            trace.close()
+        if keymap_restorers.pop(display_name, None):
+            restore_keymap()
+
+def discover_displays(socket_dir=X11_SOCKET_DIR):
+    # every local X server has a socket named X<n> here, ex: /tmp/.X11-unix/X1 -> ":1"
+    try:
+        entries = os.listdir(socket_dir)
+    except FileNotFoundError:
+        return []
+    numbers = sorted(int(e[1:]) for e in entries if e.startswith('X') and e[1:].isdigit())
+    return [f":{n}" for n in numbers]
+
+def supervise(display_names, isolate=False, rules=None, trace_file=None):
+    """
+    Runs one daemon worker per display from a single supervisor.
+
+    :param display_names: X display names to serve, ex: [":1", ":2"].
+    :param isolate: Run each worker in its own process instead of a thread of this one.
+    :param rules: Auto placement rules passed on to every worker, see load_rules().
+    :param trace_file: Record event traces, one file per display: <trace_file>.<display>
+    """
+    workers = []
+    for name in display_names:
+        print(f"Starting worker for display {name}")
+        worker_trace = config_file_for(name, trace_file + '.{}') if trace_file else None
+        if isolate:
+            worker = multiprocessing.Process(target=daemonize, args=(name, rules, worker_trace), name=f"windowcharmer{name}")
+        else:
+            worker = Thread(target=daemonize, args=(name, rules, worker_trace), name=f"windowcharmer{name}")
+            worker.daemon = True
+        worker.start()
+        workers.append(worker)
+
+    try:
+        while any(w.is_alive() for w in workers):
+            for w in workers:
+                w.join(timeout=1)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        if isolate:
+            # children get the same SIGINT from the terminal and restore their own keymaps
+            for w in workers:
+                w.join(timeout=5)
+                if w.is_alive():
+                    w.terminate()
+        else:
+            # worker threads are blocked in their event loops, so restore on their behalf
+            for name, restore_keymap in list(keymap_restorers.items()):
+                if keymap_restorers.pop(name, None):
+                    try:
+                        restore_keymap()
+                    except:
+                        print(f"Failed to restore keymap on display {name}:", sys.exc_info()[0])
 
 def main():
-    parser = argparse.ArgumentParser(description="windowcharmer - a window tiler for ultra-wide monitors, which supports 3 columns.")
+    parser = argparse.ArgumentParser(description="windowcharmer - a window tiler for ultra-wide monitors, which supports layouts of 2 to 5 columns.")
 
     # Create a mutually exclusive group
     group = parser.add_mutually_exclusive_group(required=True)
 
     # Add the positional argument "action" to the mutually exclusive group
-    group.add_argument("action", nargs='?', help="Action to perform", choices=[
-        'left', 'center', 'right', 'top-left', 'bottom-left',
-        'top-right', 'bottom-right', 'top-center', 'bottom-center',
-        'max', 'restore', 'cycle', 'install', 'bigger', 'smaller', 'test'
-    ])
+    # undo/redo are left out on purpose: the geometry history only lives in the daemon's memory
+    group.add_argument("action", nargs='?', choices=ZONE_NAMES + [
+        'max', 'restore', 'cycle', 'install', 'bigger', 'smaller', 'snapshot', 'apply-snapshot', 'test', 'inventory'
+    ], help="Action to perform (undo and redo are daemon-only: use Super+z / Super+y with -d)")
 
     # Add the "--daemonize" option to the mutually exclusive group
     group.add_argument("-d", "--daemonize", action="store_true", help="Run as a daemon")
 
+    parser.add_argument("--display", action="append", metavar="NAME",
+                        help="X display to use (default: $DISPLAY); may be repeated with -d to serve several displays")
+    parser.add_argument("--all-displays", action="store_true",
+                        help=f"with -d, serve every display that has a socket in {X11_SOCKET_DIR}")
+    parser.add_argument("--isolate", action="store_true",
+                        help="with -d, run each display in its own process instead of a thread")
+    parser.add_argument("--record-trace", metavar="FILE",
+                        help="with -d, record handled key events and actions to this file (see python -m windowcharmer.event_trace)")
+    parser.add_argument("--desktop", action="append", type=int, metavar="N",
+                        help="with inventory, only list windows on this desktop; may be repeated")
+    parser.add_argument("--zone", action="append", choices=ZONE_NAMES, metavar="ZONE",
+                        help="with inventory, only list windows tiled in this zone; may be repeated")
+    parser.add_argument("--auto-place", metavar="RULES_FILE",
+                        help="with -d, tile new windows as they appear, using the zone rules in this JSON file")
+
     # Parse the arguments
     args = parser.parse_args()
 
-    # Example usage
+    display_names = args.display or []
+    if args.isolate and not display_names and not args.all_displays:
+        # a single isolated worker for the default display
+        if 'DISPLAY' not in os.environ:
+            parser.error("--isolate needs --display, --all-displays or $DISPLAY")
+        display_names = [os.environ['DISPLAY']]
+    if args.all_displays:
+        display_names = discover_displays()
+        if not display_names:
+            parser.error(f"no X displays found in {X11_SOCKET_DIR}")
+
+    if not args.daemonize and (args.all_displays or args.isolate or args.auto_place or args.record_trace or len(display_names) > 1):
+        parser.error("--all-displays, --isolate, --auto-place, --record-trace and multiple --display options require -d")
+
+    if (args.desktop or args.zone) and args.action != 'inventory':
+        parser.error("--desktop and --zone only apply to the inventory action")
+
+    rules = None
+    if args.auto_place:
+        try:
+            rules = load_rules(args.auto_place)
+        except (OSError, ValueError) as e:
+            parser.error(f"could not load placement rules: {e}")
+        for _, _, zone in rules:
+            if zone not in ZONE_NAMES:
+                parser.error(f"unknown zone in placement rules: {zone}")
+
     if args.daemonize:
-        print("Running as a daemon")
-        daemonize()
+        if len(display_names) > 1 or args.isolate:
+            print(f"Running as a daemon for displays: {', '.join(display_names)}")
+            supervise(display_names, isolate=args.isolate, rules=rules, trace_file=args.record_trace)
+        else:
+            print("Running as a daemon")
+            daemonize(display_names[0] if display_names else None, rules, args.record_trace)
+    elif args.action == 'inventory':
+        # stdout is reserved for the JSON records, everything else goes to stderr
+        out = sys.stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            print_inventory(out, display_names[0] if display_names else None, args.desktop, args.zone)
     else:
         print(f"Performing action: {args.action}")
-        do_action(args.action)
+        do_action(args.action, display_names[0] if display_names else None)
 
 if __name__ == "__main__":
     main()